@@ -1,29 +1,153 @@
 import asyncio
-import base64
 import os
 import re
 import sys
+from collections import Counter, defaultdict
+from collections.abc import AsyncIterator, Callable, Iterable
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 from urllib.parse import quote
 
 import click
-import httpx
-from rich.console import Console
-from rich.markup import escape
-from rich.progress import Progress, SpinnerColumn, TextColumn
-from rich.table import Table
+from packaging.requirements import InvalidRequirement, Requirement
 
 from gitlab_depcheck import __version__
 
 
+# httpx and rich are slow to import and unused by --help/--version or bad
+# arguments, so they are imported by the functions that need them
+if TYPE_CHECKING:
+    from rich.console import Console
+
+
 try:
     import tomllib  # Python 3.11+
 except ImportError:
     import tomli as tomllib  # Fallback for older versions
 
+try:
+    import orjson  # Optional speedup: pip install gitlab-depcheck[speedups]
+except ImportError:
+    orjson = None
+
+try:
+    from rtoml import loads as _toml_loads  # Optional speedup for project files, same extra
+except ImportError:
+    _toml_loads = tomllib.loads
+
+
+# PEP 503: runs of -, _ and . are equivalent
+_NORM_RE = re.compile(r"[-_.]+")
+
+
+@lru_cache(maxsize=4096)
+def _normalize(name: str) -> str:
+    """
+    Normalize package name for comparison
+    PEP 503: _, -, . in package names are equivalent
+    """
+    return _NORM_RE.sub("-", name.lower())
+
+
+# PEP 508 project name at the start of a requirement; comments, blank lines and
+# pip options (-r, -e, --index-url) don't match
+_REQ_NAME_RE = re.compile(r"\s*([A-Za-z0-9](?:[A-Za-z0-9._-]*[A-Za-z0-9])?)")
+
+
+def _requirement_name(text: str) -> str | None:
+    """Normalized name a requirement string starts with, without a full parse"""
+    match = _REQ_NAME_RE.match(text)
+    return _normalize(match[1]) if match else None
+
+
+@lru_cache(maxsize=4096)
+def _parse_requirement(requirement: str) -> Requirement | None:
+    """
+    Parse a PEP 508 requirement string
+
+    Cached because identical pins show up again and again across projects.
+    """
+    try:
+        return Requirement(requirement)
+    except InvalidRequirement:
+        return None
+
 
-@dataclass
+def _load_toml(content: str) -> dict | None:
+    """Parse a TOML document, None if it is invalid"""
+    try:
+        return _toml_loads(content)
+    except Exception:
+        return None
+
+
+@lru_cache(maxsize=64)
+def _quote_path(file_path: str) -> str:
+    """URL-encode a repository file path; the same few dependency files are requested for every project"""
+    return quote(file_path, safe="")
+
+
+def _json_loads(content: bytes) -> Any:
+    """Decode a JSON response body, with orjson when it's installed"""
+    if orjson is not None:
+        return orjson.loads(content)
+
+    import json
+
+    return json.loads(content)
+
+
+def _json_dumps(data: Any) -> str:
+    """Encode data as indented JSON, with orjson when it's installed"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode()
+
+    import json
+
+    return json.dumps(data, indent=2)
+
+
+# Extras and version specifier as written after the name, e.g. "[sql, excel] >= 4.0, <5" or "(>=4.0)"
+_REQ_PARTS_RE = re.compile(r"\s*[A-Za-z0-9._-]+\s*(?:\[([^\]]*)\])?\s*\(?([^;)]*)")
+
+
+def _format_version(req: Requirement, requirement: str) -> str:
+    """
+    Render extras and version specifier, e.g. [excel]>=1.5.0
+
+    Both are taken from the requirement string so that they stay in the order
+    of the file (packaging sorts specifier clauses and keeps extras in a set).
+    """
+    match = _REQ_PARTS_RE.match(requirement)
+    if match and match[1]:
+        extras = f"[{''.join(match[1].split())}]"
+    else:
+        extras = f"[{','.join(sorted(req.extras))}]" if req.extras else ""
+    if req.url:
+        return f"{extras} @ {req.url}"
+    if not req.specifier:
+        return f"{extras}*"
+    specifier = "".join(match[2].split()) if match else ""
+    return f"{extras}{specifier or req.specifier}"
+
+
+# Contents of the given files in one round-trip; files that don't exist are left out
+_BLOBS_QUERY = """
+query($fullPath: ID!, $ref: String, $paths: [String!]!) {
+  project(fullPath: $fullPath) {
+    repository {
+      blobs(ref: $ref, paths: $paths) {
+        nodes { path rawBlob }
+      }
+    }
+  }
+}
+"""
+
+
+@dataclass(slots=True, frozen=True)
 class DependencyMatch:
     project_name: str
     project_url: str
@@ -34,10 +158,31 @@ class DependencyMatch:
 
 
 class GitLabClient:
-    def __init__(self, gitlab_url: str, token: str, timeout: int = 30):
+    # Refs probed, in order of preference, when a file is missing from an assumed main
+    FALLBACK_REFS = ("master", "develop")
+
+    def __init__(self, gitlab_url: str, token: str, timeout: int = 30, max_concurrent: int = 10):
+        import httpx
+
         self.gitlab_url = gitlab_url.rstrip("/")
         self.api_url = f"{self.gitlab_url}/api/v4"
+        self.max_concurrent = max_concurrent
+        # Cleared once the GraphQL API fails for reasons that would affect every project
+        self._graphql_available = True
+        # Every request goes to the same host: multiplex them over HTTP/2 and size
+        # the pool to the checks running in parallel (each fans out to several files).
+        # Connection failures are retried, as one dropped connection in a large scan
+        # would otherwise turn into skipped projects
+        transport = httpx.AsyncHTTPTransport(
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=max(100, max_concurrent * 4),
+                max_keepalive_connections=max_concurrent * 2,
+            ),
+            retries=2,
+        )
         self.client = httpx.AsyncClient(
+            transport=transport,
             headers={
                 "PRIVATE-TOKEN": token,
                 "Content-Type": "application/json",
@@ -58,13 +203,20 @@ class GitLabClient:
     async def get_projects(
         self, group: str | None = None, search: str | None = None, archived: bool = False
     ) -> list[dict]:
-        projects = []
-        page = 1
+        return [project async for project in self.iter_projects(group=group, search=search, archived=archived)]
 
-        if group:
-            endpoint = f"{self.api_url}/groups/{quote(group, safe='')}/projects"
-        else:
-            endpoint = f"{self.api_url}/projects"
+    async def iter_projects(
+        self, group: str | None = None, search: str | None = None, archived: bool = False
+    ) -> AsyncIterator[dict]:
+        """
+        Yield projects page by page as they arrive
+
+        Lets callers start working on the first projects while later pages
+        are still being fetched.
+        """
+        import httpx
+
+        page = 1
 
         params = {
             "per_page": 100,
@@ -76,49 +228,183 @@ class GitLabClient:
         if search:
             params["search"] = search
 
-        while True:
-            params["page"] = page
+        if group:
+            endpoint = f"{self.api_url}/groups/{quote(group, safe='')}/projects"
+            page_params = {**params, "page": page}
+        else:
+            endpoint = f"{self.api_url}/projects"
+            # Keyset pagination costs the server the same for every page, unlike offsets
+            # (which /projects also caps); group listings only support offsets
+            params.update(pagination="keyset", order_by="id", sort="asc")
+            page_params = params
 
+        url = endpoint
+        while True:
             try:
-                response = await self.client.get(endpoint, params=params)
+                response = await self.client.get(url, params=page_params)
                 response.raise_for_status()
+            except httpx.HTTPError as e:
+                print(f"Error fetching projects: {e}", file=sys.stderr)
+                return
+
+            page_projects = _json_loads(response.content)
+            if not page_projects:
+                return
+
+            for project in page_projects:
+                yield project
+
+            # Offset pages report the page count (except for very large result sets), so
+            # fetch the remaining pages concurrently instead of one by one. Checked first:
+            # /projects answers with offset pages when it can't honour keyset pagination
+            total_pages = int(response.headers.get("x-total-pages") or 0)
+            if page == 1 and total_pages > 1:
+                async for project in self._iter_pages(endpoint, params, range(2, total_pages + 1)):
+                    yield project
+                return
+
+            # Keyset pages link to the next one, query string included. Offset pages carry
+            # a Link header too, but are fetched by page number below
+            next_url = None if group else response.links.get("next", {}).get("url")
+            if next_url:
+                url, page_params = next_url, None
+                continue
 
-                page_projects = response.json()
-                if not page_projects:
-                    break
+            # Check for next page
+            if "x-next-page" not in response.headers:
+                return
 
-                projects.extend(page_projects)
+            page += 1
+            page_params = {**params, "page": page}
 
-                # Check for next page
-                if "x-next-page" not in response.headers:
-                    break
+    async def _iter_pages(self, endpoint: str, params: dict, pages: range) -> AsyncIterator[dict]:
+        import httpx
 
-                page += 1
+        # A large group has hundreds of pages: keep within the pool and GitLab's rate limits
+        semaphore = asyncio.Semaphore(self.max_concurrent)
 
-            except httpx.HTTPError as e:
-                print(f"Error fetching projects: {e}", file=sys.stderr)
-                break
+        async def get_page(page: int) -> list[dict]:
+            async with semaphore:
+                response = await self.client.get(endpoint, params={**params, "page": page})
+            response.raise_for_status()
+            return _json_loads(response.content)
 
-        return projects
+        tasks = [asyncio.create_task(get_page(page)) for page in pages]
+        try:
+            # Keep the pages in order: stop at the first one that failed
+            for task in tasks:
+                try:
+                    page_projects = await task
+                except httpx.HTTPError as e:
+                    print(f"Error fetching projects: {e}", file=sys.stderr)
+                    return
+
+                for project in page_projects:
+                    yield project
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def fetch_dependency_files(
+        self, project_path: str, ref: str, file_paths: list[str]
+    ) -> dict[str, str | None] | None:
+        """
+        Fetch several files of a project with a single GraphQL query
 
-    async def get_file_content(self, project_id: int, file_path: str, ref: str = "main") -> str | None:
-        endpoint = f"{self.api_url}/projects/{project_id}/repository/files/{quote(file_path, safe='')}"
-        refs_to_try = [ref, "master", "develop"] if ref == "main" else [ref]
+        Returns the files that exist keyed by path, with None as content when
+        GitLab doesn't inline it (e.g. large blobs). Returns None when the query
+        fails, so callers can fall back to the REST API. After an error status or
+        a query error, GraphQL isn't tried again for the rest of the run.
+        """
+        import httpx
 
-        for try_ref in refs_to_try:
-            try:
-                response = await self.client.get(endpoint, params={"ref": try_ref})
-                response.raise_for_status()
+        if not self._graphql_available:
+            return None
 
-                data = response.json()
-                content = base64.b64decode(data["content"]).decode("utf-8")
-                return content
+        variables = {"fullPath": project_path, "ref": ref, "paths": file_paths}
+        try:
+            response = await self.client.post(
+                f"{self.gitlab_url}/api/graphql", json={"query": _BLOBS_QUERY, "variables": variables}
+            )
+        except httpx.HTTPError:
+            return None
 
-            except httpx.HTTPError:
-                continue
+        try:
+            response.raise_for_status()
+            data = _json_loads(response.content)
+        except (httpx.HTTPStatusError, ValueError):
+            # GraphQL disabled, proxied away or forbidden: every project would pay for another failed POST
+            self._graphql_available = False
+            return None
+
+        if data.get("errors"):
+            # e.g. an older schema without Repository.blobs
+            self._graphql_available = False
+            return None
+
+        project = (data.get("data") or {}).get("project")
+        if not project or not project.get("repository"):
+            return None
+
+        return {blob["path"]: blob["rawBlob"] for blob in project["repository"]["blobs"]["nodes"]}
+
+    async def list_root(self, project_id: int, ref: str) -> set[str] | None:
+        """
+        List file names in the repository root
+
+        Returns None when the listing is unavailable (forbidden, unknown ref or
+        more than one page), so callers can fall back to probing files directly.
+        """
+        import httpx
+
+        endpoint = f"{self.api_url}/projects/{project_id}/repository/tree"
+
+        try:
+            response = await self.client.get(endpoint, params={"ref": ref, "per_page": 100})
+            response.raise_for_status()
+        except httpx.HTTPError:
+            return None
+
+        if response.headers.get("x-next-page"):
+            return None
+
+        return {entry["name"] for entry in _json_loads(response.content) if entry["type"] == "blob"}
+
+    async def get_file_content(self, project_id: int, file_path: str, ref: str = "main") -> str | None:
+        # The raw endpoint returns the file body as is, without a JSON envelope or base64
+        endpoint = f"{self.api_url}/projects/{project_id}/repository/files/{_quote_path(file_path)}/raw"
+
+        content = await self._fetch_file(endpoint, ref)
+        if content is not None or ref != "main":
+            return content
+
+        # main is also what we assume when the default branch is unknown, so probe the
+        # usual alternatives concurrently, still preferring them in order
+        tasks = [asyncio.create_task(self._fetch_file(endpoint, fallback)) for fallback in self.FALLBACK_REFS]
+        try:
+            for task in tasks:
+                content = await task
+                if content is not None:
+                    return content
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
 
         return None
 
+    async def _fetch_file(self, endpoint: str, ref: str) -> str | None:
+        import httpx
+
+        try:
+            response = await self.client.get(endpoint, params={"ref": ref})
+            response.raise_for_status()
+            return response.text
+
+        except httpx.HTTPError:
+            return None
+
 
 class PythonDependencyChecker:
     DEPENDENCY_FILES = [
@@ -129,13 +415,11 @@ class PythonDependencyChecker:
         "pyproject.toml",
     ]
 
-    @staticmethod
-    def normalize_package_name(name: str) -> str:
-        """
-        Normalize package name for comparison
-        PEP 503: _, -, . in package names are equivalent
-        """
-        return re.sub(r"[-_.]+", "-", name.lower())
+    # Cached: the same names come up for every line of every project
+    normalize_package_name = staticmethod(_normalize)
+
+    # The index_* methods are cached per file content and return shared objects,
+    # which callers must not modify
 
     @staticmethod
     def check_requirements_txt(content: str, package_name: str) -> tuple[str, int, str] | None:
@@ -147,67 +431,39 @@ class PythonDependencyChecker:
         - package[extra]==1.0.0
         - package[extra1,extra2]>=1.0.0
         - package [extra] ==1.0.0  (with spaces)
+        - package>=1.0.0,<2.0.0; python_version < "3.11"  (any PEP 508 requirement)
+        - package==1.0.0 --hash=sha256:...  (pip-compile hashes)
         """
-        lines = content.split("\n")
         normalized_package = PythonDependencyChecker.normalize_package_name(package_name)
+        candidates = PythonDependencyChecker.index_requirements_txt(content).get(normalized_package, ())
 
-        for i, line in enumerate(lines, 1):
-            original_line = line
-            line = line.strip()
-
-            # Skip comments and empty lines
-            if not line or line.startswith("#"):
-                continue
-
-            # Remove inline comments
-            line = line.split("#")[0].strip()
-
-            # Pattern for requirements.txt:
-            # package[extras]==version
-            # package [extras] == version
-            # ^(package-name)\s*(\[[\w,\-\.]+\])?\s*([=~<>!]+)\s*(version)
-            pattern = (
-                r"^"
-                r"([\w\-\.]+)"  # Package name (group 1)
-                r"\s*"
-                r"(\[[\w,\-\.]+\])?"  # Optional extras (group 2)
-                r"\s*"
-                r"([=~<>!]+)"  # Version operator (group 3)
-                r"\s*"
-                r"([0-9][0-9a-zA-Z._\-]*)"  # Version (group 4)
-            )
+        # The first line that parses wins; a malformed one doesn't hide a valid one further down
+        for line_number, line in candidates:
+            # Remove inline comments, line continuations and per-requirement pip options (--hash=...)
+            requirement = line.split("#")[0].split(" --")[0].rstrip("\\").strip()
 
-            match = re.match(pattern, line, re.IGNORECASE)
-            if match:
-                found_package = match.group(1)
-                normalized_found = PythonDependencyChecker.normalize_package_name(found_package)
-
-                if normalized_found == normalized_package:
-                    extras = match.group(2) or ""
-                    operator = match.group(3)
-                    version_num = match.group(4)
-                    version = f"{extras}{operator}{version_num}" if extras else f"{operator}{version_num}"
-                    return (version, i, original_line.strip())
-
-            # Without version: package or package[extras]
-            pattern_no_version = (
-                r"^"
-                r"([\w\-\.]+)"  # Package name
-                r"\s*"
-                r"(\[[\w,\-\.]+\])?"  # Optional extras
-                r"\s*$"
-            )
+            req = _parse_requirement(requirement)
+            if req and PythonDependencyChecker.normalize_package_name(req.name) == normalized_package:
+                return (_format_version(req, requirement), line_number, line)
 
-            match = re.match(pattern_no_version, line, re.IGNORECASE)
-            if match:
-                found_package = match.group(1)
-                normalized_found = PythonDependencyChecker.normalize_package_name(found_package)
+        return None
 
-                if normalized_found == normalized_package:
-                    extras = match.group(2) or ""
-                    return (f"{extras}*" if extras else "*", i, original_line.strip())
+    @staticmethod
+    @lru_cache(maxsize=128)
+    def index_requirements_txt(content: str) -> dict[str, list[tuple[int, str]]]:
+        """
+        Map normalized package names to the (line number, stripped line) pairs requiring them
 
-        return None
+        Built once per file content, so checking it for several packages costs a
+        dict lookup each. Only names are extracted here; the version is parsed
+        for the lines that are asked for.
+        """
+        index = defaultdict(list)
+        for i, line in enumerate(content.split("\n"), 1):
+            name = _requirement_name(line)
+            if name:
+                index[name].append((i, line.strip()))
+        return dict(index)
 
     @staticmethod
     def check_pyproject_toml(content: str, package_name: str) -> tuple[str, int, str] | None:
@@ -220,177 +476,145 @@ class PythonDependencyChecker:
         - package = "^1.0.0" (poetry)
         - package = {version = "^1.0.0", extras = ["kafka"]} (poetry)
         """
-        try:
-            data = tomllib.loads(content)
-        except Exception:
+        index = PythonDependencyChecker.index_pyproject_toml(content)
+        if index is None:
             return None
 
-        normalized_package = PythonDependencyChecker.normalize_package_name(package_name)
+        return index.get(PythonDependencyChecker.normalize_package_name(package_name))
 
-        # Check [project.dependencies]
-        if "project" in data and "dependencies" in data["project"]:
-            deps = data["project"]["dependencies"]
-            for dep in deps:
-                # Pattern: package[extras]operator version
-                pattern = (
-                    r"^"
-                    r"([\w\-\.]+)"  # Package name
-                    r"\s*"
-                    r"(\[[\w,\-\.]+\])?"  # Extras
-                    r"\s*"
-                    r"([=~<>!]+)"  # Operator
-                    r"\s*"
-                    r"([0-9][0-9a-zA-Z._\-]*)"  # Version
-                )
+    @staticmethod
+    @lru_cache(maxsize=128)
+    def index_pyproject_toml(content: str) -> dict[str, tuple[str, int | None, str]] | None:
+        """
+        Map normalized package names to their (version, line number, line) match
 
-                match = re.match(pattern, dep, re.IGNORECASE)
-                if match:
-                    found_package = match.group(1)
-                    normalized_found = PythonDependencyChecker.normalize_package_name(found_package)
-
-                    if normalized_found == normalized_package:
-                        extras = match.group(2) or ""
-                        operator = match.group(3)
-                        version_num = match.group(4)
-                        version = f"{extras}{operator}{version_num}" if extras else f"{operator}{version_num}"
-
-                        # Find line number - search for the line with the dependency itself
-                        lines = content.split("\n")
-                        for i, line in enumerate(lines, 1):
-                            # Search for line containing this dependency (dep) in full or partial
-                            if dep.strip() in line or (found_package in line and operator in line):
-                                return (version, i, line.strip())
-
-                        return (version, None, dep)
-
-        # Check [project.optional-dependencies]
-        if "project" in data and "optional-dependencies" in data["project"]:
-            optional_deps = data["project"]["optional-dependencies"]
-            for group_name, deps in optional_deps.items():
-                for dep in deps:
-                    pattern = (
-                        r"^"
-                        r"([\w\-\.]+)"
-                        r"\s*"
-                        r"(\[[\w,\-\.]+\])?"
-                        r"\s*"
-                        r"([=~<>!]+)"
-                        r"\s*"
-                        r"([0-9][0-9a-zA-Z._\-]*)"
-                    )
+        Sections are indexed in priority order and the first occurrence of a
+        package wins. Returns None for invalid TOML. Built once per file
+        content, which also means the TOML is parsed only once.
+        """
+        data = _load_toml(content)
+        if data is None:
+            return None
 
-                    match = re.match(pattern, dep, re.IGNORECASE)
-                    if match:
-                        found_package = match.group(1)
-                        normalized_found = PythonDependencyChecker.normalize_package_name(found_package)
-
-                        if normalized_found == normalized_package:
-                            extras = match.group(2) or ""
-                            operator = match.group(3)
-                            version_num = match.group(4)
-                            version = f"{extras}{operator}{version_num}" if extras else f"{operator}{version_num}"
-
-                            lines = content.split("\n")
-                            for i, line in enumerate(lines, 1):
-                                # Search for line containing this dependency
-                                if dep.strip() in line or (found_package in line and operator in line):
-                                    return (version, i, line.strip())
-
-                            return (version, None, f"{dep} (in {group_name})")
-
-        # Check [tool.poetry.dependencies]
-        if "tool" in data and "poetry" in data["tool"]:
-            poetry = data["tool"]["poetry"]
-            for dep_section in ["dependencies", "dev-dependencies", "group"]:
-                if dep_section == "group":
-                    # Poetry groups: [tool.poetry.group.dev.dependencies]
-                    if "group" not in poetry:
-                        continue
-                    for group_name, group_data in poetry["group"].items():
-                        if "dependencies" not in group_data:
-                            continue
-                        deps_dict = group_data["dependencies"]
-                        result = PythonDependencyChecker._check_poetry_deps(deps_dict, normalized_package, content)
-                        if result:
-                            return result
-                else:
-                    if dep_section not in poetry:
-                        continue
-                    deps_dict = poetry[dep_section]
-                    result = PythonDependencyChecker._check_poetry_deps(deps_dict, normalized_package, content)
-                    if result:
-                        return result
-
-        # Check [tool.uv]
-        if "tool" in data and "uv" in data["tool"]:
-            if "dependencies" in data["tool"]["uv"]:
-                deps = data["tool"]["uv"]["dependencies"]
-                for dep in deps:
-                    pattern = (
-                        r"^"
-                        r"([\w\-\.]+)"
-                        r"\s*"
-                        r"(\[[\w,\-\.]+\])?"
-                        r"\s*"
-                        r"([=~<>!]+)"
-                        r"\s*"
-                        r"([0-9][0-9a-zA-Z._\-]*)"
-                    )
+        index = {}
+        line_index = PythonDependencyChecker._index_lines(content)
 
-                    match = re.match(pattern, dep, re.IGNORECASE)
-                    if match:
-                        found_package = match.group(1)
-                        normalized_found = PythonDependencyChecker.normalize_package_name(found_package)
+        project = data.get("project", {})
+        tool = data.get("tool", {})
 
-                        if normalized_found == normalized_package:
-                            extras = match.group(2) or ""
-                            operator = match.group(3)
-                            version_num = match.group(4)
-                            version = f"{extras}{operator}{version_num}" if extras else f"{operator}{version_num}"
+        # [project.dependencies]
+        PythonDependencyChecker._index_dep_list(index, project.get("dependencies", []), line_index, content)
 
-                            lines = content.split("\n")
-                            for i, line in enumerate(lines, 1):
-                                # Search for line containing this dependency
-                                if dep.strip() in line or (found_package in line and operator in line):
-                                    return (version, i, line.strip())
+        # [project.optional-dependencies]
+        for group_name, deps in project.get("optional-dependencies", {}).items():
+            PythonDependencyChecker._index_dep_list(index, deps, line_index, content, label=group_name)
 
-                            return (version, None, dep)
+        # [tool.poetry.dependencies], [tool.poetry.dev-dependencies]
+        # and poetry groups: [tool.poetry.group.dev.dependencies]
+        poetry = tool.get("poetry", {})
+        poetry_sections = [poetry.get("dependencies", {}), poetry.get("dev-dependencies", {})]
+        poetry_sections += [group.get("dependencies", {}) for group in poetry.get("group", {}).values()]
+        for deps_dict in poetry_sections:
+            PythonDependencyChecker._index_poetry_deps(index, deps_dict, line_index, content)
 
-        return None
+        # [tool.uv]
+        PythonDependencyChecker._index_dep_list(index, tool.get("uv", {}).get("dependencies", []), line_index, content)
+
+        return index
 
     @staticmethod
-    def _check_poetry_deps(deps_dict: dict, normalized_package: str, content: str) -> tuple[str, int, str] | None:
-        """Check poetry dependencies in dict format"""
+    def _index_dep_list(
+        index: dict[str, tuple[str, int | None, str]],
+        deps: Iterable[str],
+        line_index: dict[str, tuple[int, str]],
+        content: str,
+        label: str | None = None,
+    ) -> None:
+        """Index a list of PEP 508 requirement strings"""
+        for dep in deps:
+            if _requirement_name(dep) in index:
+                continue
+
+            req = _parse_requirement(dep)
+            if req is None:
+                continue
+
+            version = _format_version(req, dep)
+            location = PythonDependencyChecker._find_line(dep.strip(), line_index, content)
+            if location:
+                match = (version, *location)
+            else:
+                match = (version, None, f"{dep} (in {label})" if label else dep)
+
+            index.setdefault(PythonDependencyChecker.normalize_package_name(req.name), match)
+
+    @staticmethod
+    def _index_poetry_deps(
+        index: dict[str, tuple[str, int | None, str]],
+        deps_dict: dict,
+        line_index: dict[str, tuple[int, str]],
+        content: str,
+    ) -> None:
+        """Index poetry dependencies in dict format"""
+        normalize = PythonDependencyChecker.normalize_package_name
         for dep_name, version_spec in deps_dict.items():
-            normalized_dep = PythonDependencyChecker.normalize_package_name(dep_name)
-
-            if normalized_dep == normalized_package:
-                # Version can be string or dict
-                if isinstance(version_spec, str):
-                    version = version_spec
-                elif isinstance(version_spec, dict):
-                    if "version" in version_spec:
-                        version = version_spec["version"]
-                        # Add extras info if present
-                        if "extras" in version_spec:
-                            extras_list = version_spec["extras"]
-                            extras_str = f"[{','.join(extras_list)}]"
-                            version = f"{extras_str}{version}"
-                    else:
-                        version = str(version_spec)
-                else:
-                    version = str(version_spec)
-
-                # Find line - for Poetry search for line with package name and "="
-                lines = content.split("\n")
-                for i, line in enumerate(lines, 1):
-                    # Search for line with package name in format: dep_name = "version" or dep_name = {version...}
-                    if dep_name in line and "=" in line and not line.strip().startswith("#"):
-                        return (version, i, line.strip())
-
-                return (version, None, f'{dep_name} = "{version}"')
+            normalized_dep = normalize(dep_name)
+            if normalized_dep in index:
+                continue
 
-        return None
+            # Version can be string or dict; TOML only yields exact builtin types
+            spec_type = type(version_spec)
+            if spec_type is str:
+                version = version_spec
+            elif spec_type is dict and "version" in version_spec:
+                version = version_spec["version"]
+                # Add extras info if present
+                if extras := version_spec.get("extras"):
+                    version = f"[{','.join(extras)}]{version}"
+            else:
+                version = str(version_spec)
+
+            # Find line in format: dep_name = "version" or dep_name = {version...}
+            location = PythonDependencyChecker._find_line(dep_name, line_index, content)
+            if location:
+                index[normalized_dep] = (version, *location)
+            else:
+                index[normalized_dep] = (version, None, f'{dep_name} = "{version}"')
+
+    @staticmethod
+    def _index_lines(content: str) -> dict[str, tuple[int, str]]:
+        """
+        Map meaningful lines of a TOML document to (line number, stripped line)
+
+        Array items are keyed by their unquoted value and key/value pairs by
+        their key, so that both "package>=1.0" entries and poetry style
+        package = "^1.0" entries resolve with a single dict lookup.
+        """
+        index = {}
+        for i, line in enumerate(content.split("\n"), 1):
+            stripped = line.strip()
+            if not stripped or stripped.startswith("#"):
+                continue
+            index.setdefault(stripped.rstrip(",").strip().strip("\"'"), (i, stripped))
+            if "=" in stripped:
+                index.setdefault(stripped.split("=", 1)[0].strip().strip("\"'"), (i, stripped))
+        return index
+
+    @staticmethod
+    def _find_line(needle: str, line_index: dict[str, tuple[int, str]], content: str) -> tuple[int, str] | None:
+        """Locate needle via the line index, falling back to a plain search (e.g. inline arrays)"""
+        location = line_index.get(needle)
+        if location:
+            return location
+
+        offset = content.find(needle)
+        if offset == -1:
+            return None
+
+        start = content.rfind("\n", 0, offset) + 1
+        end = content.find("\n", offset)
+        line = content[start:end] if end != -1 else content[start:]
+        return (content.count("\n", 0, offset) + 1, line.strip())
 
     @classmethod
     def check_dependency(cls, file_path: str, content: str, package_name: str) -> tuple[str, int, str] | None:
@@ -403,7 +627,7 @@ class PythonDependencyChecker:
 
 
 async def check_project(
-    client: GitLabClient, project: dict, package_name: str, console: Console
+    client: GitLabClient, project: dict, package_name: str, console: "Console"
 ) -> list[DependencyMatch]:
     matches = []
     project_id = project["id"]
@@ -411,15 +635,36 @@ async def check_project(
     project_url = project["web_url"]
     default_branch = project.get("default_branch", "main")
 
-    # Check each dependency file
-    for file_path in PythonDependencyChecker.DEPENDENCY_FILES:
+    # A single GraphQL query returns all the dependency files the project has
+    files = await client.fetch_dependency_files(project_name, default_branch, PythonDependencyChecker.DEPENDENCY_FILES)
+
+    if files is None:
+        # Fall back to REST: one tree listing saves a round-trip for every file the project doesn't have
+        present = await client.list_root(project_id, default_branch)
+        files = {fp: None for fp in PythonDependencyChecker.DEPENDENCY_FILES if present is None or fp in present}
+
+    file_paths = [fp for fp in PythonDependencyChecker.DEPENDENCY_FILES if fp in files]
+
+    # Fetch whatever wasn't returned inline all at once, then check files in priority order
+    missing = [fp for fp in file_paths if files[fp] is None]
+    contents = await asyncio.gather(
+        *(client.get_file_content(project_id, file_path, default_branch) for file_path in missing),
+        return_exceptions=True,
+    )
+    files.update(zip(missing, contents, strict=True))
+
+    for file_path in file_paths:
+        content = files[file_path]
         try:
-            content = await client.get_file_content(project_id, file_path, default_branch)
+            if isinstance(content, Exception):
+                console.print(f"[yellow]Warning: {project_name}/{file_path}: {content}[/yellow]")
+                continue
 
             if content is None:
                 continue
 
-            result = PythonDependencyChecker.check_dependency(file_path, content, package_name)
+            # Parsing is CPU-bound, keep it off the event loop so other projects' requests progress
+            result = await asyncio.to_thread(PythonDependencyChecker.check_dependency, file_path, content, package_name)
 
             if result:
                 version, line_number, line_content = result
@@ -456,40 +701,46 @@ async def search_dependencies(
     search: str | None = None,
     archived: bool = False,
     max_concurrent: int = 10,
+    on_match: Callable[[DependencyMatch], None] | None = None,
 ) -> list[DependencyMatch]:
-    console = Console()
-    console.print(f"[bold blue]🔍 Searching for package:[/bold blue] [yellow]{package_name}[/yellow]")
-
-    async with GitLabClient(gitlab_url, token) as client:
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            console=console,
-        ) as progress:
-            task = progress.add_task("Fetching projects...", total=None)
-            projects = await client.get_projects(group=group, search=search, archived=archived)
-            progress.remove_task(task)
+    """
+    Check all accessible projects for package_name
 
-        console.print(f"[green]✓[/green] Found {len(projects)} projects to check")
+    on_match is called with each match as soon as its project has been
+    checked, for output that doesn't need the full result set.
+    """
+    from rich.console import Console
+    from rich.progress import Progress
 
-        if not projects:
-            return []
+    console = Console()
+    console.print(f"[bold blue]🔍 Searching for package:[/bold blue] [yellow]{package_name}[/yellow]")
 
-        # Check projects in parallel with limit
+    async with GitLabClient(gitlab_url, token, max_concurrent=max_concurrent) as client:
         all_matches = []
 
         with Progress(console=console) as progress:
-            task = progress.add_task("[cyan]Checking projects...", total=len(projects))
+            task = progress.add_task("[cyan]Checking projects...", total=None)
             semaphore = asyncio.Semaphore(max_concurrent)
 
             async def check_with_semaphore(proj):
                 async with semaphore:
                     matches = await check_project(client, proj, package_name, console)
                     progress.advance(task)
+                    if on_match is not None:
+                        for match in matches:
+                            on_match(match)
                     return matches
 
-            # Run all checks
-            results = await asyncio.gather(*[check_with_semaphore(proj) for proj in projects], return_exceptions=True)
+            # Start checking projects as soon as their page arrives instead of
+            # waiting for the whole listing
+            checks = []
+            async for proj in client.iter_projects(group=group, search=search, archived=archived):
+                # Empty repositories have no default branch and nothing to check
+                if proj.get("default_branch"):
+                    checks.append(asyncio.create_task(check_with_semaphore(proj)))
+                    progress.update(task, total=len(checks))
+
+            results = await asyncio.gather(*checks, return_exceptions=True)
 
             # Collect results
             for result in results:
@@ -498,20 +749,25 @@ async def search_dependencies(
                 elif isinstance(result, Exception):
                     console.print(f"[red]Error: {result}[/red]")
 
+        console.print(f"[green]✓[/green] Checked {len(checks)} projects")
+
         return all_matches
 
 
-def display_results(matches: list[DependencyMatch], console: Console):
+def display_results(matches: list[DependencyMatch], console: "Console"):
+    from rich.markup import escape
+    from rich.table import Table
+
     if not matches:
         console.print("\n[yellow]No matches found[/yellow]")
         return
 
-    projects = {}
-
+    # One pass over the matches for both the per-project rows and the version tally
+    projects = defaultdict(list)
+    version_counts = Counter()
     for match in matches:
-        if match.project_name not in projects:
-            projects[match.project_name] = []
         projects[match.project_name].append(match)
+        version_counts[match.version] += 1
 
     console.print(f"\n[bold green]✓ Found in {len(projects)} projects:[/bold green]\n")
 
@@ -521,34 +777,21 @@ def display_results(matches: list[DependencyMatch], console: Console):
     table.add_column("Package", style="green", no_wrap=True, overflow="fold")
     table.add_column("Line", justify="right", style="dim")
 
-    for project_name in sorted(projects.keys()):
-        project_matches = projects[project_name]
-
-        for i, match in enumerate(project_matches):
-            if i == 0:
-                table.add_row(
-                    f"[link={match.project_url}]{project_name}[/link]",
-                    f"[link={match.file_url}]{match.file_path}[/link]",
-                    escape(match.version),
-                    str(match.line_number) if match.line_number else "-",
-                )
-            else:
-                table.add_row(
-                    "",
-                    f"[link={match.file_url}]{match.file_path}[/link]",
-                    escape(match.version),
-                    str(match.line_number) if match.line_number else "-",
-                )
+    # Show the project only on its first row
+    for project_name in sorted(projects):
+        for i, match in enumerate(projects[project_name]):
+            table.add_row(
+                f"[link={match.project_url}]{match.project_name}[/link]" if i == 0 else "",
+                f"[link={match.file_url}]{match.file_path}[/link]",
+                escape(match.version),
+                str(match.line_number) if match.line_number else "-",
+            )
 
     console.print(table)
 
     # Version statistics
     console.print("\n[bold]Version distribution:[/bold]")
-    version_counts = {}
-    for match in matches:
-        version_counts[match.version] = version_counts.get(match.version, 0) + 1
-
-    for version, count in sorted(version_counts.items(), key=lambda x: -x[1]):
+    for version, count in version_counts.most_common():
         console.print(f"  {version}: [yellow]{count}[/yellow] project(s)")
 
 
@@ -560,28 +803,31 @@ def load_config() -> dict:
     1. Current directory: .gitlab_depcheck.toml
     2. Home directory: ~/.gitlab_depcheck.toml
 
+    Parsed files are cached by modification time, so repeated calls only stat.
+
     """
 
-    local_config = Path.cwd() / ".gitlab_depcheck.toml"
-    if local_config.exists():
-        try:
-            with open(local_config, "rb") as f:
-                return tomllib.load(f)
-        except Exception:
-            pass
-
-    # Fallback to home directory
-    home_config = Path.home() / ".gitlab_depcheck.toml"
-    if home_config.exists():
+    for config_path in (Path.cwd() / ".gitlab_depcheck.toml", Path.home() / ".gitlab_depcheck.toml"):
         try:
-            with open(home_config, "rb") as f:
-                return tomllib.load(f)
-        except Exception:
-            pass
+            mtime_ns = config_path.stat().st_mtime_ns
+        except OSError:
+            continue
+
+        config = _read_config(config_path, mtime_ns)
+        if config is not None:
+            return config
 
     return {}
 
 
+@lru_cache(maxsize=8)
+def _read_config(path: Path, mtime_ns: int) -> dict | None:  # noqa: ARG001 - mtime_ns is part of the cache key
+    try:
+        return tomllib.loads(path.read_bytes().decode("utf-8"))
+    except Exception:
+        return None
+
+
 @click.command()
 @click.version_option(version=__version__, prog_name="gitlab-depcheck")
 @click.argument("package", type=str)
@@ -660,9 +906,32 @@ def main(package, url, token, group, search, archived, max_concurrent, output):
 
     group = group or config.get("search", {}).get("group")
     max_concurrent = max_concurrent or config.get("search", {}).get("max_concurrent", 10)
+
+    from rich.console import Console
+
     console = Console()
 
     try:
+        on_match = None
+        csv_header = ["Project", "File", "Version", "Line", "URL"]
+        header_written = False
+        if output == "csv":
+            import csv
+
+            def write_row(row: list) -> None:
+                # Look sys.stdout up for every row: while the progress bar is live, rich
+                # redirects it so that rows are printed above the bar. Its proxy keeps only
+                # what follows a \r on each line, so end rows with a bare \n
+                csv.writer(sys.stdout, lineterminator="\n").writerow(row)
+
+            # Write rows as projects are checked rather than after the whole scan
+            def on_match(m: DependencyMatch) -> None:
+                nonlocal header_written
+                if not header_written:
+                    write_row(csv_header)
+                    header_written = True
+                write_row([m.project_name, m.file_path, m.version, m.line_number or "", m.file_url])
+
         matches = asyncio.run(
             search_dependencies(
                 gitlab_url=gitlab_url,
@@ -672,14 +941,17 @@ def main(package, url, token, group, search, archived, max_concurrent, output):
                 search=search,
                 archived=archived,
                 max_concurrent=max_concurrent,
+                on_match=on_match,
             )
         )
 
-        if output == "table":
+        if output == "csv":
+            # Without any match the header is all there is to write
+            if not header_written:
+                write_row(csv_header)
+        elif output == "table":
             display_results(matches, console)
         elif output == "json":
-            import json
-
             data = [
                 {
                     "project": m.project_name,
@@ -691,22 +963,7 @@ def main(package, url, token, group, search, archived, max_concurrent, output):
                 }
                 for m in matches
             ]
-            click.echo(json.dumps(data, indent=2))
-        elif output == "csv":
-            import csv
-
-            writer = csv.writer(sys.stdout)
-            writer.writerow(["Project", "File", "Version", "Line", "URL"])
-            for m in matches:
-                writer.writerow(
-                    [
-                        m.project_name,
-                        m.file_path,
-                        m.version,
-                        m.line_number or "",
-                        m.file_url,
-                    ]
-                )
+            click.echo(_json_dumps(data))
 
     except KeyboardInterrupt:
         console.print("\n[yellow]Interrupted[/yellow]")
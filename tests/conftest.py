@@ -1,5 +1,9 @@
+import asyncio
+import inspect
 import pytest
 from pathlib import Path
+from types import SimpleNamespace
+from gitlab_depcheck.cli import GitLabClient
 
 
 @pytest.fixture
@@ -67,6 +71,20 @@ def mock_gitlab_projects():
     ]
 
 
+@pytest.fixture(scope="session")
+def many_projects():
+    """Enough projects to exercise the concurrency limit; tests must not mutate them"""
+    return [
+        {
+            "id": i,
+            "path_with_namespace": f"test/project{i}",
+            "web_url": f"https://gitlab.com/test/project{i}",
+            "default_branch": "main",
+        }
+        for i in range(50)
+    ]
+
+
 @pytest.fixture
 def temp_config_file(tmp_path):
     """Create a temporary config file"""
@@ -81,3 +99,37 @@ max_concurrent = 20
     config_file = tmp_path / ".gitlab_depcheck.toml"
     config_file.write_text(config_content)
     return config_file
+
+
+@pytest.fixture
+def track_concurrency():
+    """Wrap a mock handler to record how many calls to it overlap"""
+
+    def wrap(handler):
+        stats = SimpleNamespace(in_flight=0, max_in_flight=0)
+
+        async def side_effect(*args, **kwargs):
+            stats.in_flight += 1
+            stats.max_in_flight = max(stats.max_in_flight, stats.in_flight)
+            try:
+                # Yield long enough for concurrent callers to pile up
+                await asyncio.sleep(0.01)
+                result = handler(*args, **kwargs)
+                return await result if inspect.isawaitable(result) else result
+            finally:
+                stats.in_flight -= 1
+
+        return side_effect, stats
+
+    return wrap
+
+
+# Async tests and fixtures share one session event loop (see pyproject.toml). This
+# fixture stays function-scoped and closes its httpx client on exit, so no connection
+# pool is left on that loop for the next test; mock_client in test_integration.py
+# patches GitLabClient and opens no transport at all
+@pytest.fixture
+async def gitlab_client():
+    """GitLab client opened and closed around each test"""
+    async with GitLabClient("https://gitlab.example.com", "token") as client:
+        yield client
@@ -1,9 +1,13 @@
+import io
+import os
+import subprocess
+import sys
 import pytest
 from click.testing import CliRunner
 from unittest.mock import patch, AsyncMock, MagicMock
 from pathlib import Path
 from gitlab_depcheck import __version__
-from gitlab_depcheck.cli import main, load_config, DependencyMatch
+from gitlab_depcheck.cli import main, load_config, tomllib, DependencyMatch
 
 
 class TestCLI:
@@ -141,6 +145,29 @@ class TestCLI:
             assert '"project": "test/project"' in result.output
             assert '"version": "requests==2.28.0"' in result.output
 
+    def test_cli_output_json_without_orjson(self):
+        """
+        Test JSON output falls back to the standard library
+
+        """
+        runner = CliRunner()
+        matches = [
+            DependencyMatch(
+                project_name="test/project",
+                project_url="https://gitlab.com/test/project",
+                file_path="requirements.txt",
+                file_url="https://gitlab.com/test/project/-/blob/main/requirements.txt",
+                version="requests==2.28.0",
+                line_number=1,
+            )
+        ]
+
+        with patch("gitlab_depcheck.cli.asyncio.run", return_value=matches), patch("gitlab_depcheck.cli.orjson", None):
+            result = runner.invoke(main, ["requests", "--token", "test-token", "--output", "json"])
+            assert result.exit_code == 0
+            assert '"project": "test/project"' in result.output
+            assert '"line": 1' in result.output
+
     def test_cli_output_csv(self):
         """
         Test CLI with CSV output
@@ -158,11 +185,65 @@ class TestCLI:
             )
         ]
 
-        with patch("gitlab_depcheck.cli.asyncio.run", return_value=matches):
+        async def fake_search(on_match=None, **kwargs):
+            # Rows are written as matches are found, not from the returned list
+            for match in matches:
+                on_match(match)
+            return []
+
+        with patch("gitlab_depcheck.cli.search_dependencies", side_effect=fake_search):
             result = runner.invoke(main, ["requests", "--token", "test-token", "--output", "csv"])
             assert result.exit_code == 0
-            assert "test/project" in result.output
-            assert "requirements.txt" in result.output
+            lines = result.output.splitlines()
+            assert lines[0] == "Project,File,Version,Line,URL"
+            assert lines[1].startswith("test/project,requirements.txt,requests==2.28.0,1,")
+
+    def test_cli_output_csv_during_progress(self):
+        """
+        Test that CSV rows written while the progress bar is live go through rich's stdout redirect
+
+        """
+        from rich.console import Console
+        from rich.progress import Progress
+
+        runner = CliRunner()
+        match = DependencyMatch(
+            project_name="test/project",
+            project_url="https://gitlab.com/test/project",
+            file_path="requirements.txt",
+            file_url="https://gitlab.com/test/project/-/blob/main/requirements.txt",
+            version="==2.28.0",
+            line_number=1,
+        )
+        progress_output = io.StringIO()
+
+        async def fake_search(on_match=None, **kwargs):
+            with Progress(console=Console(file=progress_output, force_terminal=True, width=200)) as progress:
+                progress.add_task("Checking projects...", total=2)
+                on_match(match)
+            return [match]
+
+        with patch("gitlab_depcheck.cli.search_dependencies", side_effect=fake_search):
+            result = runner.invoke(main, ["requests", "--token", "test-token", "--output", "csv"])
+            assert result.exit_code == 0
+
+        # Printed by the progress console on a cleared line above the bar, not appended to it
+        lines = [line.rsplit("\x1b[2K", 1)[-1] for line in progress_output.getvalue().split("\n")]
+        assert "Project,File,Version,Line,URL" in lines
+        assert f"test/project,requirements.txt,==2.28.0,1,{match.file_url}" in lines
+        assert "test/project" not in result.output
+
+    def test_cli_output_csv_no_matches(self):
+        """
+        Test that the CSV header is written even when nothing matches
+
+        """
+        runner = CliRunner()
+
+        with patch("gitlab_depcheck.cli.search_dependencies", new=AsyncMock(return_value=[])):
+            result = runner.invoke(main, ["requests", "--token", "test-token", "--output", "csv"])
+            assert result.exit_code == 0
+            assert result.output.splitlines() == ["Project,File,Version,Line,URL"]
 
     def test_cli_keyboard_interrupt(self):
         """
@@ -205,6 +286,24 @@ class TestCLI:
         assert result.exit_code == 0
         assert "Check Python package dependencies" in result.output
 
+    def test_cli_version_skips_heavy_imports(self):
+        """
+        Test --version does not import httpx or rich
+
+        """
+        code = (
+            "import sys\n"
+            "from gitlab_depcheck.cli import main\n"
+            "try:\n"
+            "    main(['--version'])\n"
+            "except SystemExit:\n"
+            "    pass\n"
+            "assert 'httpx' not in sys.modules and 'rich' not in sys.modules, 'heavy import'\n"
+        )
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
+        assert __version__ in result.stdout
+
 
 class TestConfigLoading:
     """Test configuration file loading"""
@@ -258,6 +357,24 @@ class TestConfigLoading:
                 config = load_config()
                 assert config == {}
 
+    def test_load_config_cached_until_modified(self, temp_config_file):
+        """
+        Test that the config is parsed once and re-read after it changes
+
+        """
+        with patch("gitlab_depcheck.cli.Path.cwd", return_value=temp_config_file.parent):
+            with patch("gitlab_depcheck.cli.tomllib.loads", wraps=tomllib.loads) as mock_loads:
+                assert load_config()["search"]["max_concurrent"] == 20
+                assert load_config()["search"]["max_concurrent"] == 20
+                assert mock_loads.call_count == 1
+
+                temp_config_file.write_text("[search]\nmax_concurrent = 5\n")
+                stat = temp_config_file.stat()
+                os.utime(temp_config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+                assert load_config()["search"]["max_concurrent"] == 5
+                assert mock_loads.call_count == 2
+
     def test_cli_uses_config_values(self, temp_config_file):
         """
         Test that CLI uses values from config file
@@ -1,5 +1,6 @@
 import pytest
-from gitlab_depcheck.cli import PythonDependencyChecker
+from unittest.mock import patch
+from gitlab_depcheck.cli import PythonDependencyChecker, tomllib
 
 
 class TestPythonDependencyChecker:
@@ -15,6 +16,16 @@ class TestPythonDependencyChecker:
         assert PythonDependencyChecker.normalize_package_name("some.package") == "some-package"
         assert PythonDependencyChecker.normalize_package_name("my___package") == "my-package"
 
+    def test_normalize_package_name_cached(self):
+        """
+        Test that repeated names are served from the cache
+
+        """
+        PythonDependencyChecker.normalize_package_name("Cached_Package")
+        hits = PythonDependencyChecker.normalize_package_name.cache_info().hits
+        assert PythonDependencyChecker.normalize_package_name("Cached_Package") == "cached-package"
+        assert PythonDependencyChecker.normalize_package_name.cache_info().hits == hits + 1
+
     def test_check_requirements_txt_exact_version(self, sample_requirements_txt):
         """
         Test finding exact version in requirements.txt
@@ -69,9 +80,80 @@ class TestPythonDependencyChecker:
         result = PythonDependencyChecker.check_requirements_txt(sample_requirements_txt, "django")
         assert result is not None
         version, line_num, _ = result
-        assert version == ">=4.0.0"
+        assert version == ">=4.0.0,<5.0.0"
         assert line_num == 6
 
+    def test_check_requirements_txt_specifier_as_written(self):
+        """
+        Test that extras and specifier clauses are reported in file order, without spaces or parentheses
+
+        """
+        content = "pandas [sql, excel] >= 1.5 , < 2\nnumpy (<2,>=1.23)\nrich[jupyter,all]\n"
+
+        assert PythonDependencyChecker.check_requirements_txt(content, "pandas")[0] == "[sql,excel]>=1.5,<2"
+        assert PythonDependencyChecker.check_requirements_txt(content, "numpy")[0] == "<2,>=1.23"
+        assert PythonDependencyChecker.check_requirements_txt(content, "rich")[0] == "[jupyter,all]*"
+
+    def test_check_requirements_txt_markers_and_hashes(self):
+        """
+        Test environment markers and pip-compile hash continuations
+
+        """
+        content = """requests==2.28.0 ; python_version < "3.11"
+numpy==1.23.0 \\
+    --hash=sha256:0123456789abcdef
+"""
+        result = PythonDependencyChecker.check_requirements_txt(content, "requests")
+        assert result is not None
+        assert result[0] == "==2.28.0"
+
+        result = PythonDependencyChecker.check_requirements_txt(content, "numpy")
+        assert result is not None
+        version, line_num, _ = result
+        assert version == "==1.23.0"
+        assert line_num == 2
+
+    def test_check_requirements_txt_name_prefix_and_options(self):
+        """
+        Test that longer names sharing a prefix and pip options don't match
+
+        """
+        content = """-r requirements-base.txt
+-e git+https://example.com/requests.git#egg=requests
+--index-url https://pypi.example.com/requests/simple
+requests-toolbelt==1.0.0
+requests_mock>=1.10
+Requests==2.31.0
+"""
+        result = PythonDependencyChecker.check_requirements_txt(content, "requests")
+        assert result == ("==2.31.0", 6, "Requests==2.31.0")
+
+    def test_index_requirements_txt(self):
+        """
+        Test that a requirements file is indexed once and the first entry wins
+
+        """
+        content = """# pinned
+Django>=4.0  # web
+django==3.2
+pandas==2.0.0
+"""
+        index = PythonDependencyChecker.index_requirements_txt(content)
+        assert index == {"django": [(2, "Django>=4.0  # web"), (3, "django==3.2")], "pandas": [(4, "pandas==2.0.0")]}
+        assert PythonDependencyChecker.index_requirements_txt(content) is index
+
+        result = PythonDependencyChecker.check_requirements_txt(content, "django")
+        assert result == (">=4.0", 2, "Django>=4.0  # web")
+
+    def test_check_requirements_txt_skips_malformed_line(self):
+        """
+        Test that a malformed line doesn't hide a valid requirement for the same package
+
+        """
+        content = "requests==2.28.0 garbage\nrequests==2.31.0\n"
+        result = PythonDependencyChecker.check_requirements_txt(content, "requests")
+        assert result == ("==2.31.0", 2, "requests==2.31.0")
+
     def test_check_requirements_txt_not_found(self, sample_requirements_txt):
         """
         Test package not found in requirements.txt
@@ -90,6 +172,17 @@ class TestPythonDependencyChecker:
         version, _, _ = result
         assert version == "==2.28.0"
 
+    def test_check_requirements_txt_separator_variants(self):
+        """
+        Test that names matched by the requirement name regex are normalized before comparing
+
+        """
+        content = "zope-event==4.0\nZope_Interface.Ext==5.0\n"
+        result = PythonDependencyChecker.check_requirements_txt(content, "zope.interface-ext")
+        assert result is not None
+        assert result[0] == "==5.0"
+        assert result[1] == 2
+
     def test_check_pyproject_toml_dependencies(self, sample_pyproject_toml):
         """
         Test finding package in pyproject.toml [project.dependencies]
@@ -101,6 +194,34 @@ class TestPythonDependencyChecker:
         assert version == ">=8.0.0"
         assert line_num is not None
 
+    def test_check_pyproject_toml_parsed_once(self, sample_pyproject_toml):
+        """
+        Test that checking the same file for several packages parses it once
+
+        """
+        with patch("gitlab_depcheck.cli._toml_loads", wraps=tomllib.loads) as mock_loads:
+            content = sample_pyproject_toml + "\n# parsed once\n"
+            assert PythonDependencyChecker.check_pyproject_toml(content, "click") is not None
+            assert PythonDependencyChecker.check_pyproject_toml(content, "pytest") is not None
+            assert mock_loads.call_count == 1
+
+    def test_check_pyproject_toml_line_numbers(self, sample_pyproject_toml, sample_poetry_pyproject):
+        """
+        Test line numbers reported for pyproject.toml entries
+
+        """
+        assert PythonDependencyChecker.check_pyproject_toml(sample_pyproject_toml, "httpx")[1:] == (
+            6,
+            '"httpx>=0.28.0",',
+        )
+        assert PythonDependencyChecker.check_pyproject_toml(sample_poetry_pyproject, "requests")[1:] == (
+            7,
+            'requests = "^2.28.0"',
+        )
+
+        inline = '[project]\nname = "x"\ndependencies = ["click>=8.0", "httpx>=0.28"]\n'
+        assert PythonDependencyChecker.check_pyproject_toml(inline, "httpx")[1] == 3
+
     def test_check_pyproject_toml_with_extras(self, sample_pyproject_toml):
         """
         Test finding package with extras in pyproject.toml
@@ -130,6 +251,23 @@ class TestPythonDependencyChecker:
         result = PythonDependencyChecker.check_pyproject_toml(sample_pyproject_toml, "nonexistent")
         assert result is None
 
+    def test_check_pyproject_toml_uv_dependencies(self):
+        """
+        Test finding package in [tool.uv] dependencies
+
+        """
+        content = """[project]
+name = "uv-project"
+dependencies = ["click>=8.0.0"]
+
+[tool.uv]
+dependencies = [
+    "ruff==0.14.0",
+]
+"""
+        result = PythonDependencyChecker.check_pyproject_toml(content, "ruff")
+        assert result == ("==0.14.0", 7, '"ruff==0.14.0",')
+
     def test_check_poetry_dependencies(self, sample_poetry_pyproject):
         """
         Test finding package in poetry dependencies
@@ -1,13 +1,17 @@
+import asyncio
 import pytest
 import httpx
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import patch
 from gitlab_depcheck.cli import GitLabClient
 
 
+API_URL = "https://gitlab.example.com/api/v4"
+RAW_URL = f"{API_URL}/projects/1/repository/files/requirements.txt/raw"
+
+
 class TestGitLabClient:
     """Test the GitLabClient class"""
 
-    @pytest.mark.asyncio
     async def test_client_initialization(self):
         """
         Test GitLab client initialization
@@ -18,7 +22,6 @@ class TestGitLabClient:
         assert client.api_url == "https://gitlab.example.com/api/v4"
         await client.close()
 
-    @pytest.mark.asyncio
     async def test_client_url_normalization(self):
         """
         Test URL normalization (trailing slash removal)
@@ -28,7 +31,6 @@ class TestGitLabClient:
         assert client.gitlab_url == "https://gitlab.example.com"
         await client.close()
 
-    @pytest.mark.asyncio
     async def test_context_manager(self):
         """
         Test using client as async context manager
@@ -37,194 +39,387 @@ class TestGitLabClient:
         async with GitLabClient("https://gitlab.example.com", "token") as client:
             assert client.gitlab_url == "https://gitlab.example.com"
 
-    @pytest.mark.asyncio
-    async def test_get_projects_success(self, mock_gitlab_projects):
+    async def test_context_manager_closes_transport(self, respx_mock):
+        """
+        Test that leaving the context closes the httpx client, as the gitlab_client fixture relies on
+
+        """
+        respx_mock.get(f"{API_URL}/projects").respond(json=[])
+
+        async with GitLabClient("https://gitlab.example.com", "token") as client:
+            await client.get_projects()
+            assert not client.client.is_closed
+
+        # Nothing is left open on the shared session loop for the next test
+        assert client.client.is_closed
+
+    async def test_get_projects_success(self, gitlab_client, respx_mock, mock_gitlab_projects):
         """
         Test successful project fetching
 
         """
-        mock_response = MagicMock()
-        mock_response.json.return_value = mock_gitlab_projects
-        mock_response.headers = {}
+        route = respx_mock.get(f"{API_URL}/projects").respond(json=mock_gitlab_projects)
 
-        client = GitLabClient("https://gitlab.example.com", "token")
+        projects = await gitlab_client.get_projects()
+        assert len(projects) == 2
+        assert projects[0]["path_with_namespace"] == "test/project1"
+        assert route.calls.last.request.headers["PRIVATE-TOKEN"] == "token"
 
-        with patch.object(client.client, "get", new=AsyncMock(return_value=mock_response)):
-            projects = await client.get_projects()
-            assert len(projects) == 2
-            assert projects[0]["path_with_namespace"] == "test/project1"
+    async def test_get_projects_without_orjson(self, gitlab_client, respx_mock, mock_gitlab_projects):
+        """
+        Test that responses are decoded with the stdlib when orjson isn't installed
 
-        await client.close()
+        """
+        respx_mock.get(f"{API_URL}/projects").respond(json=mock_gitlab_projects)
+
+        with patch("gitlab_depcheck.cli.orjson", None):
+            projects = await gitlab_client.get_projects()
+            assert projects == mock_gitlab_projects
 
-    @pytest.mark.asyncio
-    async def test_get_projects_with_group(self, mock_gitlab_projects):
+    async def test_get_projects_with_group(self, gitlab_client, respx_mock, mock_gitlab_projects):
         """
         Test fetching projects from a specific group
 
         """
-        mock_response = MagicMock()
-        mock_response.json.return_value = mock_gitlab_projects
-        mock_response.headers = {}
+        route = respx_mock.get(f"{API_URL}/groups/test%2Fgroup/projects").respond(json=mock_gitlab_projects)
 
-        client = GitLabClient("https://gitlab.example.com", "token")
+        projects = await gitlab_client.get_projects(group="test/group")
+        assert len(projects) == 2
+        assert route.called
 
-        with patch.object(client.client, "get", new=AsyncMock(return_value=mock_response)) as mock_get:
-            projects = await client.get_projects(group="test/group")
-            assert len(projects) == 2
+    async def test_get_projects_with_search(self, gitlab_client, respx_mock):
+        """
+        Test fetching projects with search filter
 
-            # Verify the correct endpoint was called
-            call_args = mock_get.call_args
-            assert "groups/test%2Fgroup/projects" in call_args[0][0]
+        """
+        route = respx_mock.get(f"{API_URL}/projects", params={"search": "api"}).respond(
+            json=[{"id": 1, "name": "test-api"}]
+        )
 
-        await client.close()
+        projects = await gitlab_client.get_projects(search="api")
+        assert len(projects) == 1
+        assert route.called
 
-    @pytest.mark.asyncio
-    async def test_get_projects_with_search(self):
+    async def test_get_projects_pagination(self, gitlab_client, respx_mock):
         """
-        Test fetching projects with search filter
+        Test handling of paginated results
 
         """
-        mock_response = MagicMock()
-        mock_response.json.return_value = [{"id": 1, "name": "test-api"}]
-        mock_response.headers = {}
+        respx_mock.get(f"{API_URL}/projects").mock(
+            side_effect=[
+                httpx.Response(200, json=[{"id": 1}, {"id": 2}], headers={"x-next-page": "2"}),
+                httpx.Response(200, json=[{"id": 3}]),
+            ]
+        )
 
-        client = GitLabClient("https://gitlab.example.com", "token")
+        projects = await gitlab_client.get_projects()
+        assert len(projects) == 3
 
-        with patch.object(client.client, "get", new=AsyncMock(return_value=mock_response)) as mock_get:
-            projects = await client.get_projects(search="api")
-            assert len(projects) == 1
+    async def test_iter_projects_streams_pages(self, gitlab_client, respx_mock):
+        """
+        Test that projects are yielded before the next page is requested
 
-            # Verify search parameter was passed
-            call_args = mock_get.call_args
-            assert call_args[1]["params"]["search"] == "api"
+        """
+        route = respx_mock.get(f"{API_URL}/projects").mock(
+            side_effect=[
+                httpx.Response(200, json=[{"id": 1}], headers={"x-next-page": "2"}),
+                httpx.Response(200, json=[{"id": 2}]),
+            ]
+        )
+
+        projects = gitlab_client.iter_projects()
+        assert await anext(projects) == {"id": 1}
+        assert route.call_count == 1
+        assert [p async for p in projects] == [{"id": 2}]
+        assert route.call_count == 2
+
+    async def test_get_projects_total_pages(self, gitlab_client, respx_mock):
+        """
+        Test that pages are fetched concurrently when the total is known
 
-        await client.close()
+        """
+        failing_page = None
+
+        def respond(request):
+            page = int(request.url.params["page"])
+            if page == failing_page:
+                return httpx.Response(500)
+            next_page = str(page + 1) if page < 3 else ""
+            return httpx.Response(200, json=[{"id": page}], headers={"x-total-pages": "3", "x-next-page": next_page})
 
-    @pytest.mark.asyncio
-    async def test_get_projects_pagination(self):
+        route = respx_mock.get(f"{API_URL}/groups/test%2Fgroup/projects").mock(side_effect=respond)
+
+        projects = await gitlab_client.get_projects(group="test/group")
+        assert [p["id"] for p in projects] == [1, 2, 3]
+        assert route.call_count == 3
+
+        # A failing page keeps everything fetched before it
+        failing_page = 3
+        projects = await gitlab_client.get_projects(group="test/group")
+        assert [p["id"] for p in projects] == [1, 2]
+
+    async def test_get_projects_group_link_header(self, gitlab_client, respx_mock, track_concurrency):
         """
-        Test handling of paginated results
+        Test that offset pages carrying a Link header are still fetched concurrently
+
+        """
+        endpoint = f"{API_URL}/groups/test%2Fgroup/projects"
+
+        def respond(request):
+            page = int(request.url.params["page"])
+            links = [f'<{endpoint}?page=1&per_page=100>; rel="first"', f'<{endpoint}?page=4&per_page=100>; rel="last"']
+            if page < 4:
+                links.insert(0, f'<{endpoint}?page={page + 1}&per_page=100>; rel="next"')
+            headers = {"link": ", ".join(links), "x-total-pages": "4", "x-next-page": str(page + 1) if page < 4 else ""}
+            return httpx.Response(200, json=[{"id": page}], headers=headers)
+
+        side_effect, stats = track_concurrency(respond)
+        route = respx_mock.get(endpoint).mock(side_effect=side_effect)
+
+        projects = await gitlab_client.get_projects(group="test/group")
+        assert [p["id"] for p in projects] == [1, 2, 3, 4]
+        assert route.call_count == 4
+        # Pages 2..4 were requested together, not by following the next link
+        assert stats.max_in_flight == 3
+
+    async def test_get_projects_offset_fallback(self, gitlab_client, respx_mock, track_concurrency):
+        """
+        Test that /projects pages reporting a page count are fetched concurrently despite their Link header
 
         """
-        # First page response
-        mock_response_page1 = MagicMock()
-        mock_response_page1.json.return_value = [{"id": 1}, {"id": 2}]
-        mock_response_page1.headers = {"x-next-page": "2"}
 
-        # Second page response
-        mock_response_page2 = MagicMock()
-        mock_response_page2.json.return_value = [{"id": 3}]
-        mock_response_page2.headers = {}
+        def respond(request):
+            page = int(request.url.params.get("page", 1))
+            headers = {"x-total-pages": "3"}
+            if page < 3:
+                headers["link"] = f'<{API_URL}/projects?page={page + 1}&per_page=100>; rel="next"'
+            return httpx.Response(200, json=[{"id": page}], headers=headers)
 
-        client = GitLabClient("https://gitlab.example.com", "token")
+        side_effect, stats = track_concurrency(respond)
+        respx_mock.get(f"{API_URL}/projects").mock(side_effect=side_effect)
 
-        with patch.object(client.client, "get", new=AsyncMock(side_effect=[mock_response_page1, mock_response_page2])):
-            projects = await client.get_projects()
-            assert len(projects) == 3
+        projects = await gitlab_client.get_projects()
+        assert [p["id"] for p in projects] == [1, 2, 3]
+        assert stats.max_in_flight == 2
 
-        await client.close()
+    async def test_get_projects_total_pages_bounded(self, respx_mock, track_concurrency):
+        """
+        Test that concurrent page fetches stay within max_concurrent
+
+        """
+        side_effect, stats = track_concurrency(
+            lambda request: httpx.Response(
+                200, json=[{"id": int(request.url.params["page"])}], headers={"x-total-pages": "8"}
+            )
+        )
+        respx_mock.get(f"{API_URL}/groups/test%2Fgroup/projects").mock(side_effect=side_effect)
+
+        async with GitLabClient("https://gitlab.example.com", "token", max_concurrent=3) as client:
+            projects = await client.get_projects(group="test/group")
+
+        assert [p["id"] for p in projects] == list(range(1, 9))
+        assert stats.max_in_flight == 3
+
+    async def test_get_projects_keyset_pagination(self, gitlab_client, respx_mock):
+        """
+        Test that /projects uses keyset pagination and follows the next link
 
-    @pytest.mark.asyncio
-    async def test_get_projects_http_error(self):
+        """
+        next_url = f"{API_URL}/projects?pagination=keyset&id_after=1"
+
+        route = respx_mock.get(f"{API_URL}/projects").mock(
+            side_effect=[
+                httpx.Response(200, json=[{"id": 1}], headers={"link": f'<{next_url}>; rel="next"'}),
+                httpx.Response(200, json=[{"id": 2}]),
+            ]
+        )
+
+        projects = await gitlab_client.get_projects()
+        assert [p["id"] for p in projects] == [1, 2]
+
+        first_params = route.calls[0].request.url.params
+        assert first_params["pagination"] == "keyset"
+        assert first_params["order_by"] == "id"
+        assert "page" not in first_params
+        assert str(route.calls[1].request.url) == next_url
+
+    async def test_get_projects_http_error(self, gitlab_client, respx_mock):
         """
         Test handling of HTTP errors during project fetching
 
         """
-        client = GitLabClient("https://gitlab.example.com", "token")
+        respx_mock.get(f"{API_URL}/projects").mock(side_effect=httpx.ConnectError("Connection failed"))
 
-        with patch.object(client.client, "get", new=AsyncMock(side_effect=httpx.HTTPError("Connection failed"))):
-            projects = await client.get_projects()
-            assert projects == []
+        projects = await gitlab_client.get_projects()
+        assert projects == []
 
-        await client.close()
+    async def test_fetch_dependency_files(self, gitlab_client, respx_mock):
+        """
+        Test fetching several files with one GraphQL query
 
-    @pytest.mark.asyncio
-    async def test_get_file_content_success(self):
         """
-        Test successful file content retrieval
+        blobs = [
+            {"path": "requirements.txt", "rawBlob": "requests==2.28.0\n"},
+            {"path": "pyproject.toml", "rawBlob": None},
+        ]
+        route = respx_mock.post("https://gitlab.example.com/api/graphql").respond(
+            json={"data": {"project": {"repository": {"blobs": {"nodes": blobs}}}}}
+        )
+
+        files = await gitlab_client.fetch_dependency_files(
+            "group/project", "main", ["requirements.txt", "pyproject.toml"]
+        )
+        assert files == {"requirements.txt": "requests==2.28.0\n", "pyproject.toml": None}
+        assert b'"fullPath":"group/project"' in route.calls.last.request.content.replace(b" ", b"")
+
+        # Unknown projects fall back to REST, GraphQL is still used for the next one
+        route.respond(json={"data": {"project": None}})
+        assert await gitlab_client.fetch_dependency_files("group/project", "main", ["requirements.txt"]) is None
+        route.respond(json={"data": {"project": {"repository": {"blobs": {"nodes": blobs}}}}})
+        assert await gitlab_client.fetch_dependency_files("group/other", "main", ["requirements.txt"]) is not None
+
+        # Query errors fall back to REST and switch GraphQL off
+        route.respond(json={"errors": [{"message": "Field 'blobs' doesn't exist"}]})
+        assert await gitlab_client.fetch_dependency_files("group/project", "main", ["requirements.txt"]) is None
+        route.respond(json={"data": {"project": {"repository": {"blobs": {"nodes": blobs}}}}})
+        calls = route.call_count
+        assert await gitlab_client.fetch_dependency_files("group/other", "main", ["requirements.txt"]) is None
+        assert route.call_count == calls
+
+    async def test_fetch_dependency_files_graphql_unavailable(self, gitlab_client, respx_mock):
+        """
+        Test that GraphQL isn't retried for later projects once the endpoint returned an error status
 
         """
-        import base64
+        route = respx_mock.post("https://gitlab.example.com/api/graphql").respond(404)
 
-        content = "requests==2.28.0\npandas>=1.5.0"
-        encoded_content = base64.b64encode(content.encode()).decode()
+        assert await gitlab_client.fetch_dependency_files("group/project1", "main", ["requirements.txt"]) is None
+        assert await gitlab_client.fetch_dependency_files("group/project2", "main", ["requirements.txt"]) is None
+        assert route.call_count == 1
 
-        mock_response = MagicMock()
-        mock_response.json.return_value = {"content": encoded_content}
+    async def test_list_root(self, gitlab_client, respx_mock):
+        """
+        Test listing files in the repository root
 
-        client = GitLabClient("https://gitlab.example.com", "token")
+        """
+        entries = [
+            {"name": "pyproject.toml", "type": "blob"},
+            {"name": "src", "type": "tree"},
+        ]
+        route = respx_mock.get(f"{API_URL}/projects/1/repository/tree").respond(json=entries)
 
-        with patch.object(client.client, "get", new=AsyncMock(return_value=mock_response)):
-            result = await client.get_file_content(project_id=1, file_path="requirements.txt", ref="main")
-            assert result == content
+        assert await gitlab_client.list_root(project_id=1, ref="main") == {"pyproject.toml"}
 
-        await client.close()
+        # A truncated listing can't prove a file is absent
+        route.respond(json=entries, headers={"x-next-page": "2"})
+        assert await gitlab_client.list_root(project_id=1, ref="main") is None
+
+        route.respond(403)
+        assert await gitlab_client.list_root(project_id=1, ref="main") is None
 
-    @pytest.mark.asyncio
-    async def test_get_file_content_fallback_branches(self):
+    async def test_get_file_content_success(self, gitlab_client, respx_mock):
         """
-        Test fallback to master/develop when main doesn't exist
+        Test successful file content retrieval
 
         """
-        import base64
+        content = "requests==2.28.0\npandas>=1.5.0"
+        respx_mock.get(RAW_URL, params={"ref": "main"}).respond(text=content)
+
+        result = await gitlab_client.get_file_content(project_id=1, file_path="requirements.txt", ref="main")
+        assert result == content
+
+    async def test_get_file_content_fallback_branches(self, gitlab_client, respx_mock):
+        """
+        Test fallback to master/develop when main doesn't exist
 
+        """
         content = "requests==2.28.0"
-        encoded_content = base64.b64encode(content.encode()).decode()
+        respx_mock.get(RAW_URL, params={"ref": "main"}).respond(404)
+        respx_mock.get(RAW_URL, params={"ref": "master"}).respond(text=content)
+        respx_mock.get(RAW_URL, params={"ref": "develop"}).respond(404)
 
-        # First call (main) fails, second call (master) succeeds
-        mock_response_fail = MagicMock()
-        mock_response_fail.raise_for_status.side_effect = httpx.HTTPError("Not found")
+        result = await gitlab_client.get_file_content(project_id=1, file_path="requirements.txt", ref="main")
+        assert result == content
 
-        mock_response_success = MagicMock()
-        mock_response_success.json.return_value = {"content": encoded_content}
+    async def test_get_file_content_fallback_priority(self, gitlab_client, respx_mock):
+        """
+        Test that fallback refs are probed concurrently but master wins over develop
 
-        client = GitLabClient("https://gitlab.example.com", "token")
+        """
 
-        with patch.object(client.client, "get", new=AsyncMock(side_effect=[mock_response_fail, mock_response_success])):
-            result = await client.get_file_content(project_id=1, file_path="requirements.txt", ref="main")
-            assert result == content
+        async def respond(request):
+            ref = request.url.params["ref"]
+            if ref == "main":
+                return httpx.Response(404)
+            if ref == "master":
+                await asyncio.sleep(0.01)
+            return httpx.Response(200, text=ref)
 
-        await client.close()
+        route = respx_mock.get(RAW_URL).mock(side_effect=respond)
+
+        result = await gitlab_client.get_file_content(project_id=1, file_path="requirements.txt", ref="main")
+        assert result == "master"
+        assert route.call_count == 3
+        # The fallbacks are only requested once main has missed
+        assert route.calls[0].request.url.params["ref"] == "main"
 
-    @pytest.mark.asyncio
-    async def test_get_file_content_not_found(self):
+    async def test_get_file_content_main_hit_single_request(self, gitlab_client, respx_mock):
         """
-        Test file not found in any branch
+        Test that a file on main is fetched without probing the fallback refs
 
         """
-        mock_response = MagicMock()
-        mock_response.raise_for_status.side_effect = httpx.HTTPError("Not found")
+        route = respx_mock.get(RAW_URL).mock(
+            side_effect=lambda request: httpx.Response(200, text=request.url.params["ref"])
+        )
 
-        client = GitLabClient("https://gitlab.example.com", "token")
+        result = await gitlab_client.get_file_content(project_id=1, file_path="requirements.txt")
+        assert result == "main"
+        assert route.call_count == 1
 
-        with patch.object(client.client, "get", new=AsyncMock(return_value=mock_response)):
-            result = await client.get_file_content(project_id=1, file_path="nonexistent.txt", ref="main")
-            assert result is None
+    async def test_get_file_content_main_per_file(self, gitlab_client, respx_mock):
+        """
+        Test that a file found on a fallback ref doesn't stop main being tried for the next one
 
-        await client.close()
+        """
+        respx_mock.get(RAW_URL, params={"ref": "main"}).respond(404)
+        respx_mock.get(RAW_URL, params={"ref": "master"}).respond(text="requests==2.28.0")
+        respx_mock.get(RAW_URL, params={"ref": "develop"}).respond(404)
+        pyproject_url = f"{API_URL}/projects/1/repository/files/pyproject.toml/raw"
+        respx_mock.get(pyproject_url, params={"ref": "main"}).respond(text="[project]")
+        respx_mock.get(pyproject_url).respond(404)
+
+        assert await gitlab_client.get_file_content(project_id=1, file_path="requirements.txt") == "requests==2.28.0"
+        assert await gitlab_client.get_file_content(project_id=1, file_path="pyproject.toml") == "[project]"
 
-    @pytest.mark.asyncio
-    async def test_get_file_content_url_encoding(self):
+    async def test_get_file_content_no_fallback_for_custom_ref(self, gitlab_client, respx_mock):
         """
-        Test proper URL encoding of file paths
+        Test that a non-main default branch is not retried on other refs
 
         """
-        import base64
+        route = respx_mock.get(RAW_URL).respond(404)
+
+        result = await gitlab_client.get_file_content(project_id=1, file_path="requirements.txt", ref="trunk")
+        assert result is None
+        assert route.call_count == 1
+
+    async def test_get_file_content_not_found(self, gitlab_client, respx_mock):
+        """
+        Test file not found in any branch
 
-        content = "test"
-        encoded_content = base64.b64encode(content.encode()).decode()
+        """
+        respx_mock.get(f"{API_URL}/projects/1/repository/files/nonexistent.txt/raw").respond(404)
 
-        mock_response = MagicMock()
-        mock_response.json.return_value = {"content": encoded_content}
+        result = await gitlab_client.get_file_content(project_id=1, file_path="nonexistent.txt", ref="main")
+        assert result is None
 
-        client = GitLabClient("https://gitlab.example.com", "token")
+    async def test_get_file_content_url_encoding(self, gitlab_client, respx_mock):
+        """
+        Test proper URL encoding of file paths
 
-        with patch.object(client.client, "get", new=AsyncMock(return_value=mock_response)) as mock_get:
-            await client.get_file_content(project_id=1, file_path="path/to/file with spaces.txt", ref="main")
+        """
+        route = respx_mock.get(url__startswith=f"{API_URL}/projects/1/repository/files/").respond(text="test")
 
-            # Check that the URL was properly encoded
-            call_args = mock_get.call_args
-            url = call_args[0][0]
-            assert "path%2Fto%2Ffile%20with%20spaces.txt" in url
+        await gitlab_client.get_file_content(project_id=1, file_path="path/to/file with spaces.txt", ref="main")
 
-        await client.close()
+        # Check that the URL was properly encoded
+        assert b"path%2Fto%2Ffile%20with%20spaces.txt/raw" in route.calls.last.request.url.raw_path
@@ -1,248 +1,239 @@
+import asyncio
 import pytest
 from unittest.mock import patch, AsyncMock, MagicMock
-from gitlab_depcheck.cli import check_project, search_dependencies, DependencyMatch
-from rich.console import Console
+from gitlab_depcheck.cli import check_project, search_dependencies, DependencyMatch, GitLabClient
 
 
-class TestIntegration:
-    @pytest.mark.asyncio
-    async def test_check_project_finds_dependency(self, mock_gitlab_projects):
-        """
-        Test checking a project and finding a dependency
+class NullConsole:
+    """Stand-in for rich's Console that drops the warnings check_project prints"""
 
-        """
-        from gitlab_depcheck.cli import GitLabClient
+    def print(self, *args, **kwargs):
+        pass
 
-        project = mock_gitlab_projects[0]
-        console = Console()
 
-        requirements_content = "requests==2.28.0\npandas>=1.5.0"
+CONSOLE = NullConsole()
 
-        client = GitLabClient("https://gitlab.com", "test-token")
+PYPROJECT_CONTENT = """[project]
+dependencies = [
+    "requests>=2.28.0",
+    "click>=8.0.0"
+]
+"""
 
-        with patch.object(client, "get_file_content", new=AsyncMock(return_value=requirements_content)):
-            matches = await check_project(client, project, "requests", console)
 
-            assert len(matches) == 1
-            assert matches[0].project_name == "test/project1"
-            assert matches[0].version == "requests==2.28.0"
-            assert matches[0].file_path == "requirements.txt"
+async def aiter_items(items):
+    for item in items:
+        yield item
 
-        await client.close()
 
-    @pytest.mark.asyncio
-    async def test_check_project_dependency_not_found(self, mock_gitlab_projects):
-        """
-        Test checking a project when dependency is not found
+async def no_content(*args, **kwargs):
+    return None
 
-        """
-        from gitlab_depcheck.cli import GitLabClient
 
-        project = mock_gitlab_projects[0]
-        console = Console()
+def serve_files(files):
+    """Mock get_file_content that returns the content of the files in the given dict"""
 
-        requirements_content = "flask==2.0.0\ndjango>=4.0.0"
+    async def get_file_content(project_id, file_path, ref):
+        return files.get(file_path)
 
-        client = GitLabClient("https://gitlab.com", "test-token")
+    return get_file_content
 
-        with patch.object(client, "get_file_content", new=AsyncMock(return_value=requirements_content)):
-            matches = await check_project(client, project, "requests", console)
 
-            assert len(matches) == 0
+@pytest.fixture
+def mock_client():
+    """Patch GitLabClient in the CLI with a mock that finds no projects and no files"""
+    with patch("gitlab_depcheck.cli.GitLabClient") as MockClient:
+        client = AsyncMock(spec=GitLabClient)
+        client.__aenter__.return_value = client
+        client.iter_projects = MagicMock(return_value=aiter_items([]))
+        client.fetch_dependency_files.return_value = None
+        client.list_root.return_value = None
+        client.get_file_content.return_value = None
+        MockClient.return_value = client
+        yield client
 
-        await client.close()
 
-    @pytest.mark.asyncio
-    async def test_check_project_no_dependency_files(self, mock_gitlab_projects):
-        """
-        Test checking a project with no dependency files
+class TestIntegration:
+    @pytest.mark.parametrize(
+        ("file_content", "expected"),
+        [
+            pytest.param(
+                {"return_value": "requests==2.28.0\npandas>=1.5.0"},
+                [("requirements.txt", "requests==2.28.0")],
+                id="finds-dependency",
+            ),
+            pytest.param({"return_value": "flask==2.0.0\ndjango>=4.0.0"}, [], id="dependency-not-found"),
+            pytest.param({"return_value": None}, [], id="no-dependency-files"),
+            # Every file has the package, but only the first match is returned
+            pytest.param(
+                {"return_value": "requests==2.28.0"}, [("requirements.txt", "requests==2.28.0")], id="multiple-files"
+            ),
+            pytest.param(
+                {"side_effect": serve_files({"pyproject.toml": PYPROJECT_CONTENT})},
+                [("pyproject.toml", "requests>=2.28.0")],
+                id="with-pyproject-toml",
+            ),
+            pytest.param(
+                {"side_effect": serve_files({"requirements-dev.txt": "pytest\nrequests~=2.31\n"})},
+                [("requirements-dev.txt", "requests~=2.31")],
+                id="with-requirements-dev-txt",
+            ),
+            # Exceptions are handled gracefully
+            pytest.param({"side_effect": Exception("Network error")}, [], id="handles-exception"),
+        ],
+    )
+    async def test_check_project(self, gitlab_client, mock_gitlab_projects, file_content, expected):
+        """
+        Test checking a project's dependency files over REST
 
         """
-        from gitlab_depcheck.cli import GitLabClient
-
         project = mock_gitlab_projects[0]
-        console = Console()
-
-        client = GitLabClient("https://gitlab.com", "test-token")
 
-        with patch.object(client, "get_file_content", new=AsyncMock(return_value=None)):
-            matches = await check_project(client, project, "requests", console)
+        gitlab_client.fetch_dependency_files = AsyncMock(return_value=None)
+        gitlab_client.list_root = AsyncMock(return_value=None)
+        gitlab_client.get_file_content = AsyncMock(**file_content)
 
-            assert len(matches) == 0
+        matches = await check_project(gitlab_client, project, "requests", CONSOLE)
 
-        await client.close()
+        assert [(m.file_path, m.version) for m in matches] == expected
+        assert all(m.project_name == "test/project1" for m in matches)
 
-    @pytest.mark.asyncio
-    async def test_check_project_multiple_files(self, mock_gitlab_projects):
+    async def test_check_project_uses_graphql_files(self, gitlab_client, mock_gitlab_projects):
         """
-        Test that only first matching file is returned
+        Test that files returned by GraphQL are checked without REST requests
 
         """
-        from gitlab_depcheck.cli import GitLabClient
-
         project = mock_gitlab_projects[0]
-        console = Console()
-
-        requirements_content = "requests==2.28.0"
+        files = {"requirements-dev.txt": "pytest==8.0.0\n", "pyproject.toml": None}
 
-        client = GitLabClient("https://gitlab.com", "test-token")
+        gitlab_client.fetch_dependency_files = AsyncMock(return_value=files)
+        gitlab_client.list_root = AsyncMock()
+        gitlab_client.get_file_content = AsyncMock(return_value='[project]\ndependencies = ["requests>=2.0"]\n')
 
-        # Both files have the package, but only first match should be returned
-        with patch.object(client, "get_file_content", new=AsyncMock(return_value=requirements_content)):
-            matches = await check_project(client, project, "requests", console)
+        matches = await check_project(gitlab_client, project, "requests", CONSOLE)
 
-            # Should only return one match (from first file found)
-            assert len(matches) == 1
+        assert [m.file_path for m in matches] == ["pyproject.toml"]
+        gitlab_client.list_root.assert_not_called()
+        # Only the blob GitLab didn't inline is fetched over REST
+        gitlab_client.get_file_content.assert_called_once_with(1, "pyproject.toml", "main")
 
-        await client.close()
-
-    @pytest.mark.asyncio
-    async def test_check_project_with_pyproject_toml(self, mock_gitlab_projects):
+    async def test_check_project_skips_absent_files(self, gitlab_client, mock_gitlab_projects):
         """
-        Test checking project with pyproject.toml
+        Test that only files present in the repository root are fetched
 
         """
-        from gitlab_depcheck.cli import GitLabClient
-
         project = mock_gitlab_projects[0]
-        console = Console()
-
-        pyproject_content = """[project]
-dependencies = [
-    "requests>=2.28.0",
-    "click>=8.0.0"
-]
-"""
-
-        async def mock_get_file(project_id, file_path, ref):
-            if "pyproject.toml" in file_path:
-                return pyproject_content
-            return None
 
-        client = GitLabClient("https://gitlab.com", "test-token")
+        gitlab_client.fetch_dependency_files = AsyncMock(return_value=None)
+        gitlab_client.list_root = AsyncMock(return_value={"README.md", "pyproject.toml"})
+        gitlab_client.get_file_content = AsyncMock(return_value=None)
 
-        with patch.object(client, "get_file_content", new=AsyncMock(side_effect=mock_get_file)):
-            matches = await check_project(client, project, "requests", console)
+        await check_project(gitlab_client, project, "requests", CONSOLE)
 
-            assert len(matches) == 1
-            assert matches[0].version == "requests>=2.28.0"
+        gitlab_client.get_file_content.assert_called_once_with(1, "pyproject.toml", "main")
 
-        await client.close()
-
-    @pytest.mark.asyncio
-    async def test_check_project_handles_exception(self, mock_gitlab_projects):
+    async def test_check_project_fetches_files_concurrently(
+        self, gitlab_client, mock_gitlab_projects, track_concurrency
+    ):
         """
-        Test that exceptions in file checking are handled
+        Test that dependency files are fetched in parallel but the first file still wins
 
         """
-        from gitlab_depcheck.cli import GitLabClient
-
         project = mock_gitlab_projects[0]
-        console = Console()
 
-        client = GitLabClient("https://gitlab.com", "test-token")
+        async def get_file(project_id, file_path, ref):
+            # requirements.txt is checked first but answers last
+            await asyncio.sleep(0.01 if file_path == "requirements.txt" else 0)
+            return f"requests=={len(file_path)}.0"
 
-        with patch.object(client, "get_file_content", new=AsyncMock(side_effect=Exception("Network error"))):
-            matches = await check_project(client, project, "requests", console)
+        gitlab_client.fetch_dependency_files = AsyncMock(return_value=None)
+        gitlab_client.list_root = AsyncMock(return_value=None)
+        gitlab_client.get_file_content, stats = track_concurrency(get_file)
 
-            # Should handle exception gracefully and return empty list
-            assert len(matches) == 0
+        matches = await check_project(gitlab_client, project, "requests", CONSOLE)
 
-        await client.close()
+        assert stats.max_in_flight == 5
+        assert len(matches) == 1
+        assert matches[0].file_path == "requirements.txt"
 
-    @pytest.mark.asyncio
-    async def test_search_dependencies_empty_projects(self):
+    @pytest.mark.parametrize(
+        ("has_projects", "content", "expected"),
+        [
+            pytest.param(False, "requests==2.28.0", [], id="no-projects"),
+            pytest.param(True, "requests==2.28.0", ["test/project1", "test/project2"], id="with-matches"),
+            pytest.param(True, "flask==2.0.0", [], id="no-matches"),
+        ],
+    )
+    async def test_search_dependencies(self, mock_client, mock_gitlab_projects, has_projects, content, expected):
         """
-        Test search when no projects are found
+        Test the full search workflow and that on_match receives every match
 
         """
-        with patch("gitlab_depcheck.cli.GitLabClient") as MockClient:
-            mock_client_instance = MagicMock()
-            mock_client_instance.__aenter__ = AsyncMock(return_value=mock_client_instance)
-            mock_client_instance.__aexit__ = AsyncMock()
-            mock_client_instance.get_projects = AsyncMock(return_value=[])
-            MockClient.return_value = mock_client_instance
+        mock_client.iter_projects.return_value = aiter_items(mock_gitlab_projects if has_projects else [])
+        mock_client.get_file_content.return_value = content
 
-            matches = await search_dependencies(
-                gitlab_url="https://gitlab.com", token="test-token", package_name="requests"
-            )
+        reported = []
+        matches = await search_dependencies(
+            gitlab_url="https://gitlab.com", token="test-token", package_name="requests", on_match=reported.append
+        )
 
-            assert matches == []
+        assert sorted(m.project_name for m in matches) == expected
+        assert all(m.version == content for m in matches)
+        assert sorted(reported, key=lambda m: m.project_name) == sorted(matches, key=lambda m: m.project_name)
 
-    @pytest.mark.asyncio
-    async def test_search_dependencies_with_matches(self, mock_gitlab_projects):
+    async def test_search_dependencies_skips_empty_projects(self, mock_client, mock_gitlab_projects):
         """
-        Test full search workflow with matches
+        Test that projects without a default branch (empty repositories) are not checked
 
         """
-        requirements_content = "requests==2.28.0"
+        empty_project = {
+            "id": 3,
+            "path_with_namespace": "test/empty",
+            "web_url": "https://gitlab.com/test/empty",
+            "default_branch": None,
+        }
+        mock_client.iter_projects.return_value = aiter_items([*mock_gitlab_projects, empty_project])
+        mock_client.get_file_content.return_value = "requests==2.28.0"
 
-        with patch("gitlab_depcheck.cli.GitLabClient") as MockClient:
-            mock_client_instance = MagicMock()
-            mock_client_instance.__aenter__ = AsyncMock(return_value=mock_client_instance)
-            mock_client_instance.__aexit__ = AsyncMock()
-            mock_client_instance.get_projects = AsyncMock(return_value=mock_gitlab_projects)
-            mock_client_instance.get_file_content = AsyncMock(return_value=requirements_content)
-            MockClient.return_value = mock_client_instance
+        matches = await search_dependencies(
+            gitlab_url="https://gitlab.com", token="test-token", package_name="requests"
+        )
 
-            matches = await search_dependencies(
-                gitlab_url="https://gitlab.com", token="test-token", package_name="requests"
-            )
+        assert sorted(m.project_name for m in matches) == ["test/project1", "test/project2"]
+        checked_ids = {call.args[0] for call in mock_client.list_root.call_args_list}
+        assert checked_ids == {1, 2}
 
-            assert len(matches) == 2
-            assert all(m.version == "requests==2.28.0" for m in matches)
-
-    @pytest.mark.asyncio
-    async def test_search_dependencies_with_group(self, mock_gitlab_projects):
+    async def test_search_dependencies_with_group(self, mock_client, mock_gitlab_projects):
         """
         Test search with group filter
 
         """
-        with patch("gitlab_depcheck.cli.GitLabClient") as MockClient:
-            mock_client_instance = MagicMock()
-            mock_client_instance.__aenter__ = AsyncMock(return_value=mock_client_instance)
-            mock_client_instance.__aexit__ = AsyncMock()
-            mock_client_instance.get_projects = AsyncMock(return_value=mock_gitlab_projects)
-            mock_client_instance.get_file_content = AsyncMock(return_value=None)
-            MockClient.return_value = mock_client_instance
+        mock_client.iter_projects.return_value = aiter_items(mock_gitlab_projects)
 
-            await search_dependencies(
-                gitlab_url="https://gitlab.com", token="test-token", package_name="requests", group="test/group"
-            )
+        await search_dependencies(
+            gitlab_url="https://gitlab.com", token="test-token", package_name="requests", group="test/group"
+        )
 
-            # Verify get_projects was called with group parameter
-            mock_client_instance.get_projects.assert_called_once()
-            call_kwargs = mock_client_instance.get_projects.call_args[1]
-            assert call_kwargs.get("group") == "test/group"
+        # Verify iter_projects was called with group parameter
+        mock_client.iter_projects.assert_called_once()
+        call_kwargs = mock_client.iter_projects.call_args[1]
+        assert call_kwargs.get("group") == "test/group"
 
-    @pytest.mark.asyncio
-    async def test_search_dependencies_concurrent_limit(self, mock_gitlab_projects):
+    async def test_search_dependencies_concurrent_limit(self, mock_client, many_projects):
         """
         Test that concurrent requests are limited
 
         """
-        # Create many projects to test concurrency
-        many_projects = [
-            {
-                "id": i,
-                "path_with_namespace": f"test/project{i}",
-                "web_url": f"https://gitlab.com/test/project{i}",
-                "default_branch": "main",
-            }
-            for i in range(50)
-        ]
-
-        with patch("gitlab_depcheck.cli.GitLabClient") as MockClient:
-            mock_client_instance = MagicMock()
-            mock_client_instance.__aenter__ = AsyncMock(return_value=mock_client_instance)
-            mock_client_instance.__aexit__ = AsyncMock()
-            mock_client_instance.get_projects = AsyncMock(return_value=many_projects)
-            mock_client_instance.get_file_content = AsyncMock(return_value=None)
-            MockClient.return_value = mock_client_instance
+        mock_client.iter_projects.return_value = aiter_items(many_projects)
+        # Plain coroutines keep mock bookkeeping out of the fan-out
+        mock_client.fetch_dependency_files = no_content
+        mock_client.list_root = no_content
+        mock_client.get_file_content = no_content
 
+        with patch("gitlab_depcheck.cli.asyncio.Semaphore", wraps=asyncio.Semaphore) as MockSemaphore:
             matches = await search_dependencies(
                 gitlab_url="https://gitlab.com", token="test-token", package_name="requests", max_concurrent=10
             )
 
-            # Should complete without error
-            assert isinstance(matches, list)
+        assert matches == []
+        MockSemaphore.assert_called_once_with(10)